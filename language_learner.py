@@ -1,22 +1,29 @@
 import argparse
 import csv
 import hashlib
+import io
+import json
+import mmap
+import multiprocessing
 import os
+import queue
 import random
+import subprocess
 import sys
+import threading
 import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from collections import OrderedDict
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Set, Tuple
+from typing import Any, Callable, Dict, Iterator, List, Set, Tuple
 from enum import Enum
+from xml.sax.saxutils import escape
+from functools import lru_cache
+from operator import itemgetter
+from types import SimpleNamespace
 
-try:
-    from google.cloud import texttospeech
-    from google.api_core.client_options import ClientOptions
-    TTS_CLIENT = None
-    CLOUD_TTS_AVAILABLE = True
-except ImportError:
-    CLOUD_TTS_AVAILABLE = False
+TTS_CLIENT = None
 
 try:
     from pydub import AudioSegment
@@ -30,6 +37,12 @@ except ImportError:
     REAL_CONCAT_AVAILABLE = False
     FFMPEG_AVAILABLE = False
 
+try:
+    from mutagen.mp3 import MP3
+    MUTAGEN_AVAILABLE = True
+except ImportError:
+    MUTAGEN_AVAILABLE = False
+
 # =========================================================================
 # 0. Declarative Types and Enums
 # =========================================================================
@@ -52,6 +65,11 @@ def _is_pause_token(token: str) -> bool:
 def _parse_pause_sec(token: str) -> float:
     return float(token[:-1])
 
+@lru_cache(maxsize=None)
+def _content_keys(patterns: Tuple[str, ...], delimiter: str) -> Tuple[str, ...]:
+    keys = {k for p in patterns for k in p.split(delimiter)}
+    return tuple(sorted(k for k in keys if k and not _is_pause_token(k)))
+
 # =========================================================================
 # 1. Progress logging
 # GUI replaces this via set_log_callback() before calling main_workflow().
@@ -63,13 +81,28 @@ def set_log_callback(fn: Callable[[str], None]) -> None:
     global _log
     _log = fn
 
+@lru_cache(maxsize=None)
+def cloud_tts() -> Any:
+    """The Google Cloud TTS modules, imported on first use; None when not installed."""
+    # Deferred so that mock runs and the GUI never pay for importing the google client stack.
+    try:
+        from google.cloud import texttospeech
+        from google.api_core.client_options import ClientOptions
+        from google.api_core import exceptions, retry
+    except ImportError:
+        return None
+    return SimpleNamespace(texttospeech=texttospeech, ClientOptions=ClientOptions, exceptions=exceptions, retry=retry)
+
+def make_tts_client() -> Any:
+    tts = cloud_tts()
+    return tts.texttospeech.TextToSpeechClient(
+        client_options=tts.ClientOptions(api_key=os.getenv('GOOGLE_API_KEY'))
+    )
+
 def list_voices_for_language(lang_code: str) -> List[str]:
-    if not CLOUD_TTS_AVAILABLE:
+    if cloud_tts() is None:
         raise ValueError("Google Cloud TTS library is not installed")
-    client = texttospeech.TextToSpeechClient(
-        client_options=ClientOptions(api_key=os.getenv('GOOGLE_API_KEY'))
-    )
-    response = client.list_voices(language_code=lang_code)
+    response = make_tts_client().list_voices(language_code=lang_code)
     return sorted(v.name for v in response.voices)
 
 # =========================================================================
@@ -96,6 +129,9 @@ class Config:
 
     TTS_CACHE_DIR: Path = Path('tts_cache')
     TTS_CACHE_FILE_EXT: str = '.mp3'
+    CACHE_KEY_ALGO: str = 'blake2b'  # or 'sha256', the original naming
+    PCM_STORE_FILE: str = 'pcm_store.bin'
+    AUDIO_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
 
     TARGET_LANG_CODE: str = 'da-DK'
     BASE_LANG_CODE: str = 'en-GB'
@@ -131,15 +167,17 @@ class Config:
     }
     TEMPLATE_DELIMITER: str = ' '
     CONTENT_PAUSE_BUFFER_SEC: float = 0.3
-    SEGMENT_ACTIONS: Dict[str, str] = {}
     MOCK_AVG_FILE_DURATION_SEC: float = 1.0
-
-    @staticmethod
-    def get_content_keys() -> List[str]:
-        all_segments: Set[str] = set()
-        for pattern, _, _ in Config.TEMPLATES.values():
-            all_segments.update(pattern.split(Config.TEMPLATE_DELIMITER))
-        return sorted([k for k in all_segments if k and not _is_pause_token(k)])
+    TTS_MAX_WORKERS: int = 16
+    TTS_BATCH_SSML: bool = False
+    TTS_BATCH_MAX_BYTES: int = 4500
+    TTS_RETRY_TIMEOUT_SEC: float = 120.0
+    DAY_WORKERS: int = os.cpu_count() or 1
+    TRACK_WORKERS: int = 4
+    STREAM_COPY_CONCAT: bool = True
+    # LAME VBR for re-encoded tracks. V6 (~100 kbps for speech) rather than V9: V9 drops
+    # to ~65 kbps and audibly smears consonants in the target-language clips.
+    MP3_EXPORT_PARAMETERS: List[str] = ['-q:a', '6']
 
     @staticmethod
     def get_lang_config(segment_key: str) -> Tuple[str, str]:
@@ -147,17 +185,222 @@ class Config:
             return Config.BASE_LANG_CODE, Config.BASE_VOICE_NAME
         return Config.TARGET_LANG_CODE, Config.TARGET_VOICE_NAME
 
-Config.SEGMENT_ACTIONS.update({key: 'CONTENT' for key in Config.get_content_keys()})
-
 # =========================================================================
 # 4. TTS & Caching Logic
 # =========================================================================
 
-AUDIO_SEGMENT_CACHE: Dict[Path, Any] = {}
+class SegmentCache:
+    """LRU of decoded segments, bounded by total PCM bytes (Config.AUDIO_CACHE_MAX_BYTES)."""
+
+    def __init__(self):
+        self._items: 'OrderedDict[Path, Any]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()  # a day's templates are assembled on several threads
+
+    def get(self, key: Path) -> Any:
+        with self._lock:
+            seg = self._items.get(key)
+            if seg is not None:
+                self._items.move_to_end(key)
+            return seg
+
+    def put(self, key: Path, seg: Any) -> None:
+        with self._lock:
+            if key in self._items:
+                self._bytes -= len(self._items.pop(key).raw_data)
+            self._items[key] = seg
+            self._bytes += len(seg.raw_data)
+            while self._bytes > Config.AUDIO_CACHE_MAX_BYTES and len(self._items) > 1:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= len(evicted.raw_data)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+AUDIO_SEGMENT_CACHE = SegmentCache()
+AUDIO_INFO_CACHE: Dict[Path, Tuple[float, int, int]] = {}
+
+class PcmStore:
+    """Decoded PCM of cached MP3s in one memory-mapped file, so each clip is decoded once ever."""
+
+    def __init__(self, cache_dir: Path, writable: bool = True):
+        self.writable = writable
+        self.data_path = cache_dir / Config.PCM_STORE_FILE
+        self.index_path = self.data_path.with_suffix('.idx')
+        self.index: Dict[str, Tuple[int, int, int, int, int]] = {}
+        self._map = None
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Tuple[bytes, int, int, int]] = {}
+        if self.data_path.exists() and self.index_path.exists():
+            try:
+                with open(self.index_path, encoding='utf-8') as f:
+                    index = {k: tuple(v) for k, v in json.load(f).items()}
+            except Exception:
+                index = {}
+            size = self.data_path.stat().st_size
+            with os.scandir(cache_dir) as it:
+                sources = {e.name for e in it}
+            self.index = {k: v for k, v in index.items() if v[0] + v[1] <= size and k in sources}
+            live = sum(v[1] for v in self.index.values())
+            # Appends never reuse space, so dropped and re-put entries leave dead bytes behind.
+            if writable and (len(self.index) < len(index) or live < size):
+                self.compact()
+
+    def compact(self) -> None:
+        """Rewrites the data file with only the indexed entries, in offset order."""
+        tmp_path = self.data_path.with_suffix('.compact.tmp')
+        index = {}
+        with open(self.data_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            for name, (offset, length, *fmt) in sorted(self.index.items(), key=lambda kv: kv[1][0]):
+                src.seek(offset)
+                index[name] = (dst.tell(), length, *fmt)
+                dst.write(src.read(length))
+        # With the old index gone first, a crash part-way leaves an empty store, never
+        # an index pointing into the wrong file.
+        self.index_path.unlink(missing_ok=True)
+        os.replace(tmp_path, self.data_path)
+        self.index = index
+        self._dirty = True
+        self.save()
+
+    def get(self, name: str) -> Any:
+        pending = self._pending.get(name)
+        if pending is not None:
+            data, frame_rate, channels, sample_width = pending
+            return AudioSegment(data=data, sample_width=sample_width, frame_rate=frame_rate, channels=channels)
+        entry = self.index.get(name)
+        if entry is None:
+            return None
+        offset, length, frame_rate, channels, sample_width = entry
+        with self._lock:
+            if self._map is None or offset + length > len(self._map):
+                self.close()
+                with open(self.data_path, 'rb') as f:
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            data = self._map[offset:offset + length]
+        return AudioSegment(data=data, sample_width=sample_width, frame_rate=frame_rate, channels=channels)
+
+    def put(self, name: str, seg: Any) -> None:
+        self.put_raw(name, seg.raw_data, seg.frame_rate, seg.channels, seg.sample_width)
+
+    def put_raw(self, name: str, data: bytes, frame_rate: int, channels: int, sample_width: int) -> None:
+        with self._lock:
+            if not self.writable:
+                self._pending[name] = (data, frame_rate, channels, sample_width)
+                return
+            with open(self.data_path, 'ab') as f:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(data)
+            self.index[name] = (offset, len(data), frame_rate, channels, sample_width)
+            self._dirty = True
+
+    def take_pending(self) -> List[Tuple[str, bytes, int, int, int]]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return [(name, *entry) for name, entry in pending.items()]
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        tmp_path = self.index_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, separators=(',', ':'))
+        os.replace(tmp_path, self.index_path)
+        self._dirty = False
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+PCM_STORE: PcmStore = None
+
+SILENCE_FRAME_RATE = 11025  # pydub's AudioSegment.silent default
+
+@lru_cache(maxsize=256)
+def _silent(ms: int, frame_rate: int = SILENCE_FRAME_RATE) -> Any:
+    # AudioSegments are never mutated in place, so one instance per length can be shared.
+    return AudioSegment.silent(duration=ms, frame_rate=frame_rate)
+
+def decode_mp3(cached_path: Path) -> Any:
+    """Decode straight to raw s16le PCM, skipping from_mp3's WAV round-trip."""
+    if MUTAGEN_AVAILABLE:
+        try:
+            header = MP3(cached_path).info
+            raw = subprocess.run([AudioSegment.converter, '-v', 'error', '-i', str(cached_path),
+                                  '-f', 's16le', '-acodec', 'pcm_s16le',
+                                  '-ar', str(header.sample_rate), '-ac', str(header.channels), '-'],
+                                 stdin=subprocess.DEVNULL, capture_output=True, check=True).stdout
+            return AudioSegment(data=raw, sample_width=2, frame_rate=header.sample_rate, channels=header.channels)
+        except Exception:
+            pass
+    return AudioSegment.from_mp3(cached_path)
+
+def load_audio_segment(cached_path: Path) -> Any:
+    if _file_size(cached_path, CACHE_INDEX) == 0:
+        return _silent(100)
+    seg = PCM_STORE.get(cached_path.name) if PCM_STORE else None
+    if seg is None:
+        seg = decode_mp3(cached_path)
+        if PCM_STORE: PCM_STORE.put(cached_path.name, seg)
+    return seg
+
+CACHE_KEY_HASHES: Dict[str, Callable[[bytes], str]] = {
+    'blake2b': lambda data: hashlib.blake2b(data, digest_size=16).hexdigest(),
+    'sha256': lambda data: hashlib.sha256(data).hexdigest(),
+}
+
+@lru_cache(maxsize=8192)
+def _cache_key(text: str, language_code: str, voice_name: str, speed: float, algo: str = 'blake2b') -> str:
+    return CACHE_KEY_HASHES[algo](f"{text}{language_code}{voice_name}{speed}".encode())
+
+@lru_cache(maxsize=8192)
+def _cache_path(cache_dir: Path, ext: str, algo: str, text: str, language_code: str, voice_name: str, speed: float) -> Path:
+    return cache_dir / f"{_cache_key(text, language_code, voice_name, speed, algo)}{ext}"
 
 def get_cache_path(text: str, language_code: str, voice_name: str, speed: float = 1.0) -> Path:
-    content_hash = hashlib.sha256(f"{text}{language_code}{voice_name}{speed}".encode()).hexdigest()
-    return Config.TTS_CACHE_DIR / f"{content_hash}{Config.TTS_CACHE_FILE_EXT}"
+    # The Config fields are part of the memo key, so runs that repoint the cache stay correct.
+    return _cache_path(Config.TTS_CACHE_DIR, Config.TTS_CACHE_FILE_EXT, Config.CACHE_KEY_ALGO,
+                       text, language_code, voice_name, speed)
+
+def _migrate_legacy_cache_file(text: str, language_code: str, voice_name: str, speed: float, new_path: Path) -> bool:
+    # A cache written under another CACHE_KEY_ALGO is adopted by renaming instead of paying for re-synthesis.
+    for algo in CACHE_KEY_HASHES:
+        if algo == Config.CACHE_KEY_ALGO: continue
+        legacy_path = Config.TTS_CACHE_DIR / f"{_cache_key(text, language_code, voice_name, speed, algo)}{Config.TTS_CACHE_FILE_EXT}"
+        if legacy_path.exists():
+            try:
+                os.replace(legacy_path, new_path)
+            except FileNotFoundError:
+                # Another day worker adopted it between the check and the rename.
+                return new_path.exists()
+            return True
+    return False
+
+def tts_retry() -> Any:
+    # Quota (429) and transient server errors back off exponentially, with jitter, instead
+    # of leaving an empty placeholder in the cache; other errors still fail at once.
+    retry, exceptions = cloud_tts().retry, cloud_tts().exceptions
+    return retry.Retry(
+        predicate=retry.if_exception_type(
+            exceptions.TooManyRequests, exceptions.InternalServerError,
+            exceptions.ServiceUnavailable, exceptions.DeadlineExceeded),
+        initial=1.0, maximum=30.0, multiplier=2.0, timeout=Config.TTS_RETRY_TIMEOUT_SEC)
+
+def write_file_atomic(path: Path, data: bytes) -> None:
+    # One unbuffered write of the response bytes; a BufferedWriter would only add a copy.
+    tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+    os.replace(tmp_path, path)
 
 def real_google_cloud_api(text: str, language_code: str, voice_name: str, cache_hits: List[int], api_calls: List[int], speed: float = 1.0) -> Path:
     global TTS_CLIENT
@@ -171,26 +414,85 @@ def real_google_cloud_api(text: str, language_code: str, voice_name: str, cache_
         return real_file_path
 
     api_calls[0] += 1
+    texttospeech = cloud_tts().texttospeech
     synthesis_input = texttospeech.SynthesisInput(text=text)
     voice = texttospeech.VoiceSelectionParams(language_code=language_code, name=voice_name)
     audio_config = texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding.MP3, speaking_rate=speed)
 
     try:
-        response = TTS_CLIENT.synthesize_speech(input=synthesis_input, voice=voice, audio_config=audio_config)
-        with open(real_file_path, "wb") as out:
-            out.write(response.audio_content)
+        response = TTS_CLIENT.synthesize_speech(input=synthesis_input, voice=voice, audio_config=audio_config, retry=tts_retry())
+        write_file_atomic(real_file_path, response.audio_content)
         return real_file_path
     except Exception as e:
         _log(f"    ❌ TTS Error: {e}")
         real_file_path.touch(exist_ok=True)
         return real_file_path
 
+def _ssml_batches(requests: List[Tuple[str, str, str, float]]) -> Iterator[List[Tuple[str, str, str, float]]]:
+    groups: Dict[Tuple[str, str, float], List[Tuple[str, str, str, float]]] = {}
+    for req in requests:
+        groups.setdefault(req[1:], []).append(req)
+    for group in groups.values():
+        batch, size = [], 0
+        for req in group:
+            piece = len(escape(req[0]).encode()) + 64
+            if batch and size + piece > Config.TTS_BATCH_MAX_BYTES:
+                yield batch
+                batch, size = [], 0
+            batch.append(req)
+            size += piece
+        if batch:
+            yield batch
+
+def synthesize_ssml_batches(requests: List[Tuple[str, str, str, float]], api_calls: List[int]) -> List[Tuple[str, str, str, float]]:
+    """Synthesizes misses sharing a voice in one marked-up SSML request; returns the leftovers."""
+    try:
+        from google.cloud import texttospeech_v1beta1 as tts_beta
+        from pydub.silence import detect_leading_silence
+        client = tts_beta.TextToSpeechClient(client_options=cloud_tts().ClientOptions(api_key=os.getenv('GOOGLE_API_KEY')))
+    except Exception:
+        return requests
+
+    remaining = []
+    for batch in _ssml_batches(requests):
+        if len(batch) == 1:
+            remaining.extend(batch)
+            continue
+        _, lang, voice_name, speed = batch[0]
+        ssml = "<speak>" + "".join(
+            f'<mark name="{i}"/>{escape(text)}<break time="500ms"/>' for i, (text, _, _, _) in enumerate(batch)
+        ) + "</speak>"
+        try:
+            response = client.synthesize_speech(request=tts_beta.SynthesizeSpeechRequest(
+                input=tts_beta.SynthesisInput(ssml=ssml),
+                voice=tts_beta.VoiceSelectionParams(language_code=lang, name=voice_name),
+                audio_config=tts_beta.AudioConfig(audio_encoding=tts_beta.AudioEncoding.MP3, speaking_rate=speed),
+                enable_time_pointing=[tts_beta.SynthesizeSpeechRequest.TimepointType.SSML_MARK],
+            ), retry=tts_retry())
+            api_calls[0] += len(batch)
+            marks = {int(tp.mark_name): tp.time_seconds * 1000.0 for tp in response.timepoints}
+            if len(marks) != len(batch):
+                raise ValueError(f"expected {len(batch)} timepoints, got {len(marks)}")
+            audio = AudioSegment.from_file(io.BytesIO(response.audio_content), format='mp3')
+            for i, req in enumerate(batch):
+                clip = audio[marks[i]:marks.get(i + 1, len(audio))]
+                clip = clip[:len(clip) - detect_leading_silence(clip.reverse())]
+                path = get_cache_path(*req)
+                tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+                clip.export(tmp_path, format='mp3')
+                os.replace(tmp_path, path)
+        except Exception as e:
+            _log(f"    ❌ TTS batch error ({len(batch)} texts, retrying singly): {e}")
+            remaining.extend(req for req in batch if not get_cache_path(*req).exists())
+    return remaining
+
 def mock_google_tts(text: str, language_code: str, voice_name: str, cache_hits: List[int], api_calls: List[int], speed: float = 1.0) -> Path:
     mock_file_path = get_cache_path(text, language_code, voice_name, speed)
-    if not mock_file_path.exists():
-        mock_file_path.touch(exist_ok=True)
+    # An exclusive create both tests for and makes the placeholder in one call.
+    try:
+        os.close(os.open(mock_file_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
         api_calls[0] += 1
-    else:
+    except FileExistsError:
         cache_hits[0] += 1
     return mock_file_path
 
@@ -204,62 +506,222 @@ def pre_cache_day_segments(full_schedule: List[ScheduleItem], use_real_tts_mode:
     unique_requests: Set[Tuple[str, str, str, float]] = set()
     required_speeds = set(speed for _, speed, ot in Config.TEMPLATES.values() if ot == 'audio')
 
-    audio_keys: Set[str] = set(
-        k for _, (pattern, _, ot) in Config.TEMPLATES.items()
-        if ot == 'audio'
-        for k in pattern.split(Config.TEMPLATE_DELIMITER)
-        if k and not _is_pause_token(k)
-    )
+    audio_patterns = tuple(pattern for pattern, _, ot in Config.TEMPLATES.values() if ot == 'audio')
+    audio_keys = _content_keys(audio_patterns, Config.TEMPLATE_DELIMITER)
+    lang_config = {key: Config.get_lang_config(key) for key in audio_keys}
     for item in full_schedule:
         for key in audio_keys:
             text = item.get(key)
-            lang, voice = Config.get_lang_config(key)
             if not text: continue
+            lang, voice = lang_config[key]
             if key == 'L2':
                 for s in required_speeds: unique_requests.add((text, lang, voice, s))
             else:
                 unique_requests.add((text, lang, voice, 1.0))
 
-    for text, lang, voice, speed in unique_requests:
-        tts_func(text, lang, voice, cache_hits, api_calls, speed)
-
+    # Cache hits are counted here; only misses go to the pool, since each
+    # synthesis is a blocking HTTP round-trip that overlaps well in threads.
+    index = cache_index()
+    missing = []
+    for req in unique_requests:
+        path = get_cache_path(*req)
+        if path.name in index or path.exists() or _migrate_legacy_cache_file(*req, path):
+            cache_hits[0] += 1
+        else:
+            missing.append(req)
+    fetched = missing
+    if missing and use_real_tts_mode and Config.TTS_BATCH_SSML and TTS_CLIENT is not None and FFMPEG_AVAILABLE:
+        missing = synthesize_ssml_batches(missing, api_calls)
+    if not missing:
+        _index_cache_files(index, fetched)
+        return cache_hits[0], api_calls[0]
+
+    with ThreadPoolExecutor(max_workers=Config.TTS_MAX_WORKERS) as executor:
+        futures = {}
+        for text, lang, voice, speed in missing:
+            hits, calls = [0], [0]
+            fut = executor.submit(tts_func, text, lang, voice, hits, calls, speed)
+            futures[fut] = (text, hits, calls)
+        for fut in as_completed(futures):
+            text, hits, calls = futures[fut]
+            try:
+                fut.result()
+            except Exception as e:
+                _log(f"    ❌ TTS Error ({text!r}): {e}")
+            cache_hits[0] += hits[0]
+            api_calls[0] += calls[0]
+
+    _index_cache_files(index, fetched)
     return cache_hits[0], api_calls[0]
 
-def generate_audio_from_template(day_path: Path, day_num: int, template_name: str, pattern: str, data: List[ScheduleItem], use_concat: bool, template_speed: float) -> Tuple[Path, float]:
+def _index_cache_files(index: Dict[str, int], requests: List[Tuple[str, str, str, float]]) -> None:
+    for req in requests:
+        path = get_cache_path(*req)
+        try:
+            index[path.name] = path.stat().st_size
+        except OSError:
+            pass
+
+def concat_segments(parts: List[Any]) -> Any:
+    # AudioSegment += copies everything accumulated so far, so a day's track
+    # would cost O(N^2) bytes. Sync formats once and join the raw PCM instead.
+    # Only public pydub API: widest format wins, as with +.
+    if not parts:
+        return AudioSegment.empty()
+    channels = max(p.channels for p in parts)
+    frame_rate = max(p.frame_rate for p in parts)
+    sample_width = max(p.sample_width for p in parts)
+    data = b"".join(p.set_channels(channels).set_frame_rate(frame_rate).set_sample_width(sample_width).raw_data
+                    for p in parts)
+    return AudioSegment(data=data, sample_width=sample_width, frame_rate=frame_rate, channels=channels)
+
+def get_audio_segment(cached_path: Path) -> Any:
+    seg = AUDIO_SEGMENT_CACHE.get(cached_path)
+    if seg is None:
+        seg = load_audio_segment(cached_path)
+        AUDIO_SEGMENT_CACHE.put(cached_path, seg)
+    return seg
+
+CACHE_INDEX: Dict[str, int] = None
+
+def cache_index() -> Dict[str, int]:
+    """{file name: size or None} for the TTS cache, listed once per run."""
+    global CACHE_INDEX
+    if CACHE_INDEX is None:
+        with os.scandir(Config.TTS_CACHE_DIR) as it:
+            CACHE_INDEX = dict.fromkeys(e.name for e in it if e.is_file())
+    return CACHE_INDEX
+
+def _file_size(path: Path, sizes: Dict[str, int] = None) -> int:
+    size = sizes.get(path.name) if sizes is not None else None
+    if size is None:
+        size = path.stat().st_size
+        if sizes is not None: sizes[path.name] = size
+    return size
+
+def get_audio_info(cached_path: Path, sizes: Dict[str, int] = None) -> Tuple[float, int, int]:
+    """(duration_ms, frame_rate, channels) of a cached clip, from the MP3 headers when possible."""
+    info = AUDIO_INFO_CACHE.get(cached_path)
+    if info is not None:
+        return info
+    if MUTAGEN_AVAILABLE and _file_size(cached_path, sizes) > 0:
+        try:
+            header = MP3(cached_path).info
+            info = (header.length * 1000.0, header.sample_rate, header.channels)
+        except Exception:
+            info = None
+    if info is None:
+        seg = get_audio_segment(cached_path)
+        info = (float(len(seg)), seg.frame_rate, seg.channels)
+    AUDIO_INFO_CACHE[cached_path] = info
+    return info
+
+def get_silence_clip(ms: int, frame_rate: int, channels: int) -> Path:
+    ms = int(round(ms, -1))
+    path = Config.TTS_CACHE_DIR / f"silence_{ms}ms_{frame_rate}hz_{channels}ch{Config.TTS_CACHE_FILE_EXT}"
+    if not path.exists():
+        tmp_path = path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        AudioSegment.silent(duration=ms, frame_rate=frame_rate).set_channels(channels).export(tmp_path, format='mp3')
+        os.replace(tmp_path, path)
+    return path
+
+def stream_copy_concat(clips: List[Tuple[Path, int, int]], audio_format: Tuple[int, int], output_path: Path, sizes: Dict[str, int] = None) -> bool:
+    """Splice cached MP3s with ffmpeg's concat demuxer; False when they can't be stream-copied."""
+    # clips holds (path, 0, frame_rate) for speech and (None, ms, frame_rate) for silence.
+    if any(_file_size(p, sizes) == 0 for p in {p for p, _, _ in clips if p}):
+        return False
+    lines = []
+    for path, ms, _ in clips:
+        if path is None:
+            path = get_silence_clip(ms, *audio_format)
+        lines.append("file '" + str(path.resolve()).replace("'", "'\\''") + "'")
+    list_path = output_path.with_suffix('.concat.txt')
+    list_path.write_text("\n".join(lines) + "\n", encoding='utf-8')
+    try:
+        subprocess.run(
+            [AudioSegment.converter, '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0',
+             '-i', str(list_path), '-c', 'copy', str(output_path)],
+            check=True, capture_output=True,
+        )
+        return True
+    except (OSError, subprocess.CalledProcessError):
+        output_path.unlink(missing_ok=True)
+        return False
+    finally:
+        list_path.unlink(missing_ok=True)
+
+PlanStep = Tuple[str, str, str, str, float]
+
+@lru_cache(maxsize=64)
+def _template_plan(pattern: str, template_speed: float, delimiter: str,
+                   base: Tuple[str, str], target: Tuple[str, str]) -> Tuple[PlanStep, ...]:
+    # base/target only key the memo, so that voice overrides rebuild the plan;
+    # the lookup itself stays Config.get_lang_config.
+    plan: List[PlanStep] = []
+    content_keys = _content_keys((pattern,), delimiter)
+    for seg_key in pattern.split(delimiter):
+        if not seg_key: continue
+        if seg_key in content_keys:
+            lang, voice = Config.get_lang_config(seg_key)
+            plan.append(('CONTENT', seg_key, lang, voice, template_speed if seg_key == 'L2' else 1.0))
+        elif _is_pause_token(seg_key):
+            plan.append(('PAUSE', seg_key, '', '', _parse_pause_sec(seg_key)))
+    return tuple(plan)
+
+def get_template_plan(pattern: str, template_speed: float) -> Tuple[PlanStep, ...]:
+    """The pattern resolved into (action, key, lang, voice, speed-or-pause-seconds) steps, memoized."""
+    return _template_plan(pattern, template_speed, Config.TEMPLATE_DELIMITER,
+                          (Config.BASE_LANG_CODE, Config.BASE_VOICE_NAME),
+                          (Config.TARGET_LANG_CODE, Config.TARGET_VOICE_NAME))
+
+def generate_audio_from_template(day_path: Path, day_num: int, template_name: str, pattern: str, data: List[ScheduleItem], use_concat: bool, template_speed: float, cache_sizes: Dict[str, int] = None) -> Tuple[Path, float]:
     padded_day = str(day_num).zfill(3)
     output_path = day_path / f"{padded_day}_{template_name}.mp3"
     expected_duration = 0.0
-    final_audio = AudioSegment.empty() if use_concat else None
+    clips: List[Tuple[Path, int, int]] = []
+    formats: Set[Tuple[int, int]] = set()
+    plan = get_template_plan(pattern, template_speed)
+    # Bound once here: the loop below runs per token per item.
+    pause_buffer_ms = Config.CONTENT_PAUSE_BUFFER_SEC * 1000.0
+    mock_ms = Config.MOCK_AVG_FILE_DURATION_SEC * 1000.0
+    add_clip, add_format = clips.append, formats.add
+    # Flow patterns repeat L2 several times per item; build each Path once.
+    paths: Dict[Tuple[str, str, str, float], Path] = {}
+    get_path = paths.get
 
     for item in data:
-        for seg_key in pattern.split(Config.TEMPLATE_DELIMITER):
-            if not seg_key: continue
-            action = Config.SEGMENT_ACTIONS.get(seg_key)
-
+        for action, seg_key, lang, voice, value in plan:
             if action == 'CONTENT':
-                text = item.get(seg_key, "")
-                lang, voice = Config.get_lang_config(seg_key)
-                speed = template_speed if seg_key == 'L2' else 1.0
-                cached_path = get_cache_path(text, lang, voice, speed)
-
-                dur_ms = Config.MOCK_AVG_FILE_DURATION_SEC * 1000.0
+                # An empty cell, or a token that isn't a source column, has no clip
+                # (pre-caching skips empty text), so the step and its pause are left out.
+                text = item.get(seg_key)
+                if not text: continue
+                key = (text, lang, voice, value)
+                cached_path = get_path(key)
+                if cached_path is None:
+                    cached_path = paths[key] = get_cache_path(*key)
+
+                dur_ms = mock_ms
                 if use_concat:
-                    if cached_path not in AUDIO_SEGMENT_CACHE:
-                        AUDIO_SEGMENT_CACHE[cached_path] = AudioSegment.from_mp3(cached_path) if cached_path.stat().st_size > 0 else AudioSegment.silent(duration=100)
-                    seg = AUDIO_SEGMENT_CACHE[cached_path]
-                    final_audio += seg
-                    dur_ms = float(len(seg))
+                    dur_ms, frame_rate, channels = get_audio_info(cached_path, cache_sizes)
+                    add_clip((cached_path, 0, frame_rate))
+                    add_format((frame_rate, channels))
 
-                pause_ms = dur_ms + (Config.CONTENT_PAUSE_BUFFER_SEC * 1000.0)
+                pause_ms = dur_ms + pause_buffer_ms
                 expected_duration += (dur_ms + pause_ms) / 1000.0
-                if use_concat: final_audio += AudioSegment.silent(duration=int(pause_ms))
+                # 10 ms steps keep the number of distinct silences small for _silent's LRU
+                # and the silence clips on disk.
+                if use_concat: add_clip((None, int(round(pause_ms, -1)), frame_rate))
 
-            elif _is_pause_token(seg_key):
-                pause_sec = _parse_pause_sec(seg_key)
-                expected_duration += pause_sec
-                if use_concat: final_audio += AudioSegment.silent(duration=int(pause_sec * 1000))
-
-    if use_concat: final_audio.export(output_path, format='mp3')
+            else:
+                expected_duration += value
+                if use_concat: add_clip((None, int(value * 1000), SILENCE_FRAME_RATE))
+
+    if use_concat:
+        copied = Config.STREAM_COPY_CONCAT and len(formats) == 1 and stream_copy_concat(clips, formats.pop(), output_path, cache_sizes)
+        if not copied:
+            parts = [get_audio_segment(p) if p else _silent(ms, fr) for p, ms, fr in clips]
+            concat_segments(parts).export(output_path, format='mp3', parameters=Config.MP3_EXPORT_PARAMETERS)
     else: output_path.touch()
     return output_path, expected_duration
 
@@ -279,115 +741,239 @@ def generate_csv_from_template(day_path: Path, day_num: int, template_name: str,
     extra = [f for f in (data[0].keys() if data else []) if f not in seen]
     fields = content_keys + extra
     with open(output_path, 'w', newline='', encoding='utf-8-sig') as f:
-        writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
-        writer.writeheader()
-        for item in data:
-            writer.writerow(item)
+        writer = csv.writer(f)
+        writer.writerow(fields)
+        # Schedule items share one schema, so when every column is present a C-level
+        # itemgetter projects the rows; a pattern key missing from the source is left blank.
+        if data and len(fields) > 1 and all(k in data[0] for k in fields):
+            writer.writerows(map(itemgetter(*fields), data))
+        else:
+            writer.writerows([item.get(k, '') for k in fields] for item in data)
     return output_path
 
-def process_day(day: int, full_schedule: List[ScheduleItem], use_tts: bool, use_concat: bool) -> float:
+def process_day(day: int, full_schedule: List[ScheduleItem], use_tts: bool, use_concat: bool, precached: bool = False) -> float:
     padded_day = str(day).zfill(3)
     day_path = Config.OUTPUT_ROOT_DIR / f"day_{padded_day}"
-    day_path.mkdir(parents=True, exist_ok=True)
+    existing = list_dir_names(day_path)
+
+    # One pass splits the day by type; every filter below is then a dict lookup.
+    new_type, review_type = ScheduleType.NEW.value, ScheduleType.REVIEW.value
+    by_type: Dict[str, List[ScheduleItem]] = {new_type: [], review_type: []}
+    for i in full_schedule:
+        by_type[i['type']].append(i)
 
     missing = []
     for name, (_, speed, ot) in Config.TEMPLATES.items():
         ext = 'csv' if ot == 'csv' else 'mp3'
-        if (day_path / f"{padded_day}_{name}.{ext}").exists():
+        if f"{padded_day}_{name}.{ext}" in existing:
+            continue
+        if ot != 'csv' and not by_type[new_type if speed != 1.0 else review_type]:
             continue
-        if ot != 'csv':
-            target_type = ScheduleType.NEW.value if speed != 1.0 else ScheduleType.REVIEW.value
-            if not any(i['type'] == target_type for i in full_schedule):
-                continue
         missing.append(name)
     if not missing:
         return 0.0
+    if not existing:
+        day_path.mkdir(parents=True, exist_ok=True)
 
-    new_count = sum(1 for i in full_schedule if i['type'] == ScheduleType.NEW.value)
-    rev_count = len(full_schedule) - new_count
+    new_count = len(by_type[new_type])
+    rev_count = len(by_type[review_type])
     _log(f"\n--- 📝 Day {padded_day} ({new_count} New, {rev_count} Review) ---")
 
-    hits, calls = pre_cache_day_segments(full_schedule, use_tts)
-    total_segments = hits + calls
-    hit_rate = (hits / total_segments * 100) if total_segments > 0 else 0
-    _log(f"    - TTS Cache: {hit_rate:.1f}% hit rate ({calls} new calls)")
+    if not precached:
+        hits, calls = pre_cache_day_segments(full_schedule, use_tts)
+        total_segments = hits + calls
+        hit_rate = (hits / total_segments * 100) if total_segments > 0 else 0
+        _log(f"    - TTS Cache: {hit_rate:.1f}% hit rate ({calls} new calls)")
+    cache_sizes = cache_index() if use_concat else None
 
-    review_items = [i for i in full_schedule if i['type'] == ScheduleType.REVIEW.value]
+    review_items = by_type[review_type]
     shuffled_review = random.Random(day).sample(review_items, len(review_items))
 
-    day_total_duration = 0.0
-    for name, (pattern, speed, output_type) in Config.TEMPLATES.items():
-        ext = 'csv' if output_type == 'csv' else 'mp3'
-        output_file = day_path / f"{padded_day}_{name}.{ext}"
-        if output_file.exists():
-            continue
+    # Templates don't depend on each other, so their tracks are assembled on a few
+    # threads (the time goes to ffmpeg subprocesses); logs keep template order.
+    jobs = []
+    with ThreadPoolExecutor(max_workers=Config.TRACK_WORKERS if use_concat else 1) as executor:
+        for name, (pattern, speed, output_type) in Config.TEMPLATES.items():
+            ext = 'csv' if output_type == 'csv' else 'mp3'
+            if f"{padded_day}_{name}.{ext}" in existing:
+                continue
+
+            if output_type == 'csv':
+                jobs.append((output_type, executor.submit(generate_csv_from_template, day_path, day, name, pattern, shuffled_review)))
+                continue
+
+            target_type = new_type if speed != 1.0 else review_type
+            source = by_type[target_type]
+            if not source: continue
+
+            sequenced = shuffled_review if target_type == review_type else source
+
+            jobs.append((output_type, executor.submit(generate_audio_from_template, day_path, day, name, pattern,
+                                                      sequenced, use_concat, speed, cache_sizes)))
 
+    day_total_duration = 0.0
+    for output_type, fut in jobs:
         if output_type == 'csv':
-            path = generate_csv_from_template(day_path, day, name, pattern, shuffled_review)
+            path = fut.result()
             _log(f"    - {path.name:25} | {len(shuffled_review)} rows")
             continue
 
-        target_type = ScheduleType.NEW.value if speed != 1.0 else ScheduleType.REVIEW.value
-        source = [i for i in full_schedule if i['type'] == target_type]
-        if not source: continue
-
-        sequenced = shuffled_review if target_type == ScheduleType.REVIEW.value else list(source)
-
-        path, dur = generate_audio_from_template(day_path, day, name, pattern, sequenced, use_concat, speed)
+        path, dur = fut.result()
         day_total_duration += dur
 
         m, s = divmod(int(dur), 60)
         _log(f"    - {path.name:25} | {m:02d}:{s:02d}")
 
+    if PCM_STORE: PCM_STORE.save()
     return day_total_duration
 
-def load_and_validate_source_data() -> Tuple[List[ScheduleItem], int]:
-    if not Config.SOURCE_FILE.exists():
-        return [], 0
-
-    with open(Config.SOURCE_FILE, 'r', encoding='utf-8-sig') as f:
+def _read_source_rows(source_file: Path, int_columns: Tuple[str, ...] = ()) -> List[ScheduleItem]:
+    with open(source_file, 'r', encoding='utf-8-sig') as f:
         sample = f.read(2048)
         f.seek(0)
         try:
             dialect = csv.Sniffer().sniff(sample, delimiters=',;')
         except Exception:
             dialect = 'excel'
-        reader = csv.DictReader(f, dialect=dialect)
-        if reader.fieldnames:
-            reader.fieldnames = [n.strip() for n in reader.fieldnames]
-        data = [{k.strip(): v.strip() for k, v in row.items() if k} for row in reader]
+        reader = csv.reader(f, dialect=dialect)
+        header = next(reader, [])
+        columns = [(name.strip(), idx) for idx, name in enumerate(header) if name.strip()]
+        width = len(header)
+        # Typed columns are converted while the row is built, not in a second pass.
+        casts = [(name, idx) for name, idx in columns if name in int_columns]
+        data = []
+        for row in reader:
+            if not row: continue
+            if len(row) < width: row += [''] * (width - len(row))
+            item = {name: row[idx].strip() for name, idx in columns}
+            for name, idx in casts:
+                item[name] = int(item[name])
+            data.append(item)
+    return data
+
+_WORKER_LOG_QUEUE: Any = None
+
+def _init_day_worker(config_state: Dict[str, Any], workers: int, log_queue: Any) -> None:
+    global PCM_STORE, _WORKER_LOG_QUEUE
+    # Workers are spawned, so they start from the module defaults; replay the
+    # parent's Config (CLI/server overrides) and split the track threads and the
+    # decoded-segment budget between them. They get no TTS client: the parent has
+    # already synthesized everything, so the pool never calls the API.
+    for name, value in config_state.items():
+        setattr(Config, name, value)
+    Config.TRACK_WORKERS = max(1, Config.TRACK_WORKERS // workers)
+    Config.AUDIO_CACHE_MAX_BYTES = Config.AUDIO_CACHE_MAX_BYTES // workers
+    PCM_STORE = PcmStore(Config.TTS_CACHE_DIR, writable=False)
+    _WORKER_LOG_QUEUE = log_queue
+
+def _process_day_worker(day: int, full_schedule: List[ScheduleItem], use_concat: bool) -> Tuple[float, List[Tuple[str, bytes, int, int, int]]]:
+    set_log_callback(lambda line: _WORKER_LOG_QUEUE.put((day, line)))
+    day_dur = process_day(day, full_schedule, False, use_concat, precached=True)
+    # Only the parent writes the PCM store, so hand back what this day decoded.
+    return day_dur, PCM_STORE.take_pending()
+
+def run_days(days: List[int], schedules: Dict[int, List[ScheduleItem]], use_tts: bool, use_concat: bool) -> Iterator[float]:
+    """Runs process_day for each day, over a process pool when assembling audio; yields in day order."""
+    workers = min(Config.DAY_WORKERS, len(days))
+    if workers <= 1 or not use_concat:
+        for d in days:
+            yield process_day(d, schedules.get(d, []), use_tts, use_concat)
+        return
 
+    # Days running side by side share review items, so every clip they need is
+    # synthesized here, once, before any worker starts.
+    hits, calls = pre_cache_day_segments([i for d in days for i in schedules.get(d, [])], use_tts)
+    total_segments = hits + calls
+    hit_rate = (hits / total_segments * 100) if total_segments > 0 else 0
+    _log(f"TTS Cache: {hit_rate:.1f}% hit rate ({calls} new calls) for {len(days)} days")
+
+    config_state = {k: v for k, v in vars(Config).items() if k.isupper()}
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Manager() as manager:
+        log_queue = manager.Queue()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_day_worker,
+                                 initargs=(config_state, workers, log_queue)) as pool:
+            futures = [pool.submit(_process_day_worker, d, schedules.get(d, []), use_concat) for d in days]
+            held: Dict[int, List[str]] = {d: [] for d in days}
+            for day, fut in zip(days, futures):
+                for line in held.pop(day):
+                    _log(line)
+
+                def route(msg: Tuple[int, str]) -> None:
+                    if msg[0] == day: _log(msg[1])
+                    else: held[msg[0]].append(msg[1])
+
+                while not fut.done():
+                    try:
+                        route(log_queue.get(timeout=0.1))
+                    except queue.Empty:
+                        pass
+                # A worker's puts complete before its result is sent, so its lines are all queued by now.
+                while True:
+                    try:
+                        route(log_queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                day_dur, pcm_entries = fut.result()
+                if PCM_STORE:
+                    for entry in pcm_entries:
+                        if entry[0] not in PCM_STORE.index: PCM_STORE.put_raw(*entry)
+                    PCM_STORE.save()
+                yield day_dur
+
+def load_and_validate_source_data() -> Tuple[List[ScheduleItem], int]:
+    if not Config.SOURCE_FILE.exists():
+        return [], 0
+
+    data = _read_source_rows(Config.SOURCE_FILE, int_columns=('StudyDay',))
     if not data:
         return [], 0
 
-    try:
-        for i in data:
-            i['StudyDay'] = int(i['StudyDay'])
-        return data, max((int(i['StudyDay']) for i in data), default=0)
-    except KeyError:
+    if 'StudyDay' not in data[0]:
         raise ValueError(
             f"Key 'StudyDay' not found in your CSV.\n"
             f"Detected columns: {list(data[0].keys())}\n"
             f"Source file: {Config.SOURCE_FILE}"
         )
+    return data, max(map(itemgetter('StudyDay'), data))
 
 def generate_full_repetition_schedule(master: List[ScheduleItem], max_day: int) -> Dict[int, List[ScheduleItem]]:
-    schedules = {}
-    for d in range(1, max_day + 1):
-        items = []
-        for i in master:
-            if i['StudyDay'] == d: items.append({**i, 'type': ScheduleType.NEW.value})
-            elif any(i['StudyDay'] + interval == d for interval in Config.MACRO_REPETITION_INTERVALS):
-                items.append({**i, 'type': ScheduleType.REVIEW.value})
-        schedules[d] = items
+    # One pass over master, dropping each item into the days it is due on.
+    # Walking master in order keeps every day's list in source order, which
+    # the seeded review shuffle in process_day relies on. Items are read-only
+    # from here on, so one REVIEW dict is shared by all the days it is due on.
+    schedules: Dict[int, List[ScheduleItem]] = {d: [] for d in range(1, max_day + 1)}
+    intervals = sorted({iv for iv in Config.MACRO_REPETITION_INTERVALS if iv != 0})
+    for i in master:
+        study_day = i['StudyDay']
+        if study_day in schedules:
+            schedules[study_day].append({**i, 'type': ScheduleType.NEW.value})
+        review = None
+        for interval in intervals:
+            day_items = schedules.get(study_day + interval)
+            if day_items is None: continue
+            if review is None: review = {**i, 'type': ScheduleType.REVIEW.value}
+            day_items.append(review)
     return schedules
 
-def is_day_complete(day: int) -> bool:
+def list_dir_names(path: Path) -> Set[str]:
+    # One directory read answers every "does this output exist?" question for a day.
+    try:
+        with os.scandir(path) as it:
+            return {e.name for e in it}
+    except FileNotFoundError:
+        return set()
+
+def is_day_complete(day: int, day_dirs: Set[str] = None) -> bool:
     padded_day = str(day).zfill(3)
-    path = Config.OUTPUT_ROOT_DIR / f"day_{padded_day}"
+    # day_dirs, a listing of OUTPUT_ROOT_DIR, lets days never generated skip their own scandir.
+    if day_dirs is not None and f"day_{padded_day}" not in day_dirs:
+        return False
+    existing = list_dir_names(Config.OUTPUT_ROOT_DIR / f"day_{padded_day}")
     for name, (_, _, output_type) in Config.TEMPLATES.items():
         ext = 'csv' if output_type == 'csv' else 'mp3'
-        if not (path / f"{padded_day}_{name}.{ext}").exists():
+        if f"{padded_day}_{name}.{ext}" not in existing:
             return False
     return True
 
@@ -406,18 +992,7 @@ def zip_output_dir(output_dir: Path, extra_files: List[Path] = []) -> Path:
 def load_sentence_pairs(source_file: Path) -> List[ScheduleItem]:
     if not source_file.exists():
         raise ValueError(f"Source file not found: {source_file}")
-    with open(source_file, 'r', encoding='utf-8-sig') as f:
-        sample = f.read(2048)
-        f.seek(0)
-        try:
-            dialect = csv.Sniffer().sniff(sample, delimiters=',;')
-        except Exception:
-            dialect = 'excel'
-        reader = csv.DictReader(f, dialect=dialect)
-        if reader.fieldnames:
-            reader.fieldnames = [n.strip() for n in reader.fieldnames]
-        data = [{k.strip(): v.strip() for k, v in row.items() if k} for row in reader]
-    return data
+    return _read_source_rows(source_file)
 
 def sentence_pairs_workflow(run_config: RunConfig, use_tts: bool, use_concat: bool) -> None:
     pairs = load_sentence_pairs(Config.SOURCE_FILE)
@@ -441,31 +1016,28 @@ def sentence_pairs_workflow(run_config: RunConfig, use_tts: bool, use_concat: bo
     total_segments = hits + calls
     hit_rate = (hits / total_segments * 100) if total_segments > 0 else 0
     _log(f"TTS Cache: {hit_rate:.1f}% hit rate ({calls} new calls)\n")
+    cache_sizes = cache_index() if use_concat else None
 
-    content_keys = sorted(set(
-        k for k in pattern.split(Config.TEMPLATE_DELIMITER)
-        if k and not _is_pause_token(k)
-    ))
-    manifest_rows: List[Dict[str, str]] = []
+    content_keys = list(_content_keys((pattern,), Config.TEMPLATE_DELIMITER))
+    manifest_rows: List[List[str]] = []
 
     for idx, pair in enumerate(pairs, 1):
         _, dur = generate_audio_from_template(
             Config.OUTPUT_ROOT_DIR, idx, run_config.template, pattern,
-            [pair], use_concat, speed
+            [pair], use_concat, speed, cache_sizes
         )
         padded = str(idx).zfill(3)
         out_filename = f"{padded}_{run_config.template}.mp3"
-        row = {k: pair.get(k, '') for k in content_keys}
-        row['filename'] = out_filename
-        manifest_rows.append(row)
+        manifest_rows.append([pair.get(k, '') for k in content_keys] + [out_filename])
         m, s = divmod(int(dur), 60)
         _log(f"  {out_filename} | {m:02d}:{s:02d}")
 
+    if PCM_STORE: PCM_STORE.save()
+
     manifest_path = Config.OUTPUT_ROOT_DIR / "manifest.csv"
-    fields = content_keys + ['filename']
     with open(manifest_path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fields)
-        writer.writeheader()
+        writer = csv.writer(f)
+        writer.writerow(content_keys + ['filename'])
         writer.writerows(manifest_rows)
 
     _log(f"\n✅ Generated {len(pairs)} files → {Config.OUTPUT_ROOT_DIR}")
@@ -477,7 +1049,7 @@ def run_environment_check() -> Tuple[bool, bool]:
     Config.OUTPUT_ROOT_DIR.mkdir(exist_ok=True, parents=True)
     Config.TTS_CACHE_DIR.mkdir(exist_ok=True, parents=True)
 
-    use_tts = (Config.USE_REAL_TTS and CLOUD_TTS_AVAILABLE)
+    use_tts = (Config.USE_REAL_TTS and cloud_tts() is not None)
     use_concat = (REAL_CONCAT_AVAILABLE and FFMPEG_AVAILABLE)
 
     _log(f"--- 🚀 Environment Ready ---")
@@ -494,19 +1066,22 @@ def run_environment_check() -> Tuple[bool, bool]:
 
 def main_workflow(run_config: RunConfig = None) -> None:
     """Main entry point for both CLI and GUI. Raises ValueError on bad input."""
-    global TTS_CLIENT
+    global TTS_CLIENT, PCM_STORE, CACHE_INDEX
     if run_config is None:
         run_config = RunConfig()
 
     AUDIO_SEGMENT_CACHE.clear()
+    AUDIO_INFO_CACHE.clear()
+    CACHE_INDEX = None
     TTS_CLIENT = None
+    if PCM_STORE: PCM_STORE.close()
 
     use_tts, use_concat = run_environment_check()
-
-    if use_tts:
-        TTS_CLIENT = texttospeech.TextToSpeechClient(client_options=ClientOptions(api_key=os.getenv('GOOGLE_API_KEY')))
+    PCM_STORE = PcmStore(Config.TTS_CACHE_DIR) if use_concat else None
 
     if run_config.mode == 'pairs':
+        if use_tts:
+            TTS_CLIENT = make_tts_client()
         sentence_pairs_workflow(run_config, use_tts, use_concat)
         return
 
@@ -518,12 +1093,16 @@ def main_workflow(run_config: RunConfig = None) -> None:
     days_processed = 0
     total_session_duration = 0.0
 
-    for d in range(1, max_d + 1):
-        if not is_day_complete(d):
-            day_dur = process_day(d, schedules.get(d, []), use_tts, use_concat)
-            if day_dur > 0:
-                total_session_duration += day_dur
-                days_processed += 1
+    day_dirs = list_dir_names(Config.OUTPUT_ROOT_DIR)
+    pending = [d for d in range(1, max_d + 1) if not is_day_complete(d, day_dirs)]
+    # A resumed run with nothing to do never connects the TTS client. This is the only
+    # client: day workers get none, since run_days pre-caches every pending day here.
+    if use_tts and pending:
+        TTS_CLIENT = make_tts_client()
+    for day_dur in run_days(pending, schedules, use_tts, use_concat):
+        if day_dur > 0:
+            total_session_duration += day_dur
+            days_processed += 1
 
     if days_processed == 0:
         _log(f"✅ All {max_d} days are up to date in iCloud.")
@@ -1,5 +1,6 @@
 import io
 import json
+import os
 import queue
 from datetime import date
 import re
@@ -498,11 +499,19 @@ def list_files(profile: str = Query(...), username: str = Depends(_get_user)):
     output = _profile_path(username, profile) / "output"
     if not output.exists():
         return {"days": []}
+    # Output is at most two levels deep (day folders, or flat files in pairs
+    # mode); scandir reuses the dirent type instead of a stat() per file.
     days: dict = {}
-    for f in sorted(output.rglob("*")):
-        if f.is_file():
-            day = f.parent.name
-            days.setdefault(day, []).append(f.name)
+    with os.scandir(output) as it:
+        entries = sorted(it, key=lambda e: e.name)
+    for e in entries:
+        if e.is_file(follow_symlinks=False):
+            days.setdefault(output.name, []).append(e.name)
+        elif e.is_dir(follow_symlinks=False):
+            with os.scandir(e.path) as sub:
+                names = sorted(s.name for s in sub if s.is_file(follow_symlinks=False))
+            if names:
+                days.setdefault(e.name, []).extend(names)
     return {"days": [{"day": k, "files": v} for k, v in days.items()]}
 
 
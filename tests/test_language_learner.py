@@ -0,0 +1,150 @@
+import pytest
+
+import language_learner as ll
+
+
+def test_template_skips_unknown_tokens_and_empty_cells_in_mock_mode(tmp_path):
+    data = [{'L1': 'hello', 'L2': ''}]
+    path, dur = ll.generate_audio_from_template(tmp_path, 1, 't', 'L1 L3 1.0s L2', data, False, 1.0)
+    # Only L1 (mock clip + its pause) and the explicit 1.0s pause remain.
+    mock = ll.Config.MOCK_AVG_FILE_DURATION_SEC
+    assert dur == pytest.approx(mock + mock + ll.Config.CONTENT_PAUSE_BUFFER_SEC + 1.0)
+    assert path.exists()
+
+
+def test_template_never_looks_up_clips_for_missing_text(tmp_path, monkeypatch):
+    looked_up, spliced = [], []
+
+    def fake_info(cached_path, sizes=None):
+        looked_up.append(cached_path)
+        return 500.0, 24000, 1
+
+    def fake_concat(clips, audio_format, output_path, sizes=None):
+        spliced.extend(clips)
+        return True
+
+    monkeypatch.setattr(ll, 'get_audio_info', fake_info)
+    monkeypatch.setattr(ll, 'stream_copy_concat', fake_concat)
+    monkeypatch.setattr(ll.Config, 'STREAM_COPY_CONCAT', True)
+
+    data = [{'L1': 'hello', 'L2': ''}, {'L1': '', 'L2': 'hej'}]
+    ll.generate_audio_from_template(tmp_path, 1, 't', 'L1 l2 L2', data, True, 1.0)
+
+    lang1, voice1 = ll.Config.get_lang_config('L1')
+    lang2, voice2 = ll.Config.get_lang_config('L2')
+    assert looked_up == [ll.get_cache_path('hello', lang1, voice1, 1.0),
+                         ll.get_cache_path('hej', lang2, voice2, 1.0)]
+    assert [p for p, _, _ in spliced if p] == looked_up
+
+
+def test_schedule_does_not_mutate_master_rows(monkeypatch):
+    monkeypatch.setattr(ll.Config, 'MACRO_REPETITION_INTERVALS', [1, 3])
+    master = [{'StudyDay': 1, 'L1': 'a', 'L2': 'b'}, {'StudyDay': 2, 'L1': 'c', 'L2': 'd'}]
+    schedules = ll.generate_full_repetition_schedule(master, 4)
+
+    assert master == [{'StudyDay': 1, 'L1': 'a', 'L2': 'b'}, {'StudyDay': 2, 'L1': 'c', 'L2': 'd'}]
+    assert [(i['L1'], i['type']) for i in schedules[2]] == [('a', 'review'), ('c', 'new')]
+    assert [(i['L1'], i['type']) for i in schedules[4]] == [('a', 'review')]
+    schedules[1][0]['extra'] = 1
+    assert 'extra' not in master[0]
+
+
+def test_legacy_migration_tolerates_a_concurrent_rename(tmp_path, monkeypatch):
+    monkeypatch.setattr(ll.Config, 'TTS_CACHE_DIR', tmp_path)
+    monkeypatch.setattr(ll.Config, 'CACHE_KEY_ALGO', 'blake2b')
+    req = ('hej', 'da-DK', 'da-DK-Neural2-D', 1.0)
+    legacy = tmp_path / f"{ll._cache_key(*req, 'sha256')}{ll.Config.TTS_CACHE_FILE_EXT}"
+    legacy.write_bytes(b'mp3')
+    new_path = ll.get_cache_path(*req)
+
+    def lose_race(src, dst):
+        # The other worker wins: the file lands at dst before our rename runs.
+        real_replace(src, dst)
+        raise FileNotFoundError(src)
+
+    real_replace = ll.os.replace
+    monkeypatch.setattr(ll.os, 'replace', lose_race)
+    assert ll._migrate_legacy_cache_file(*req, new_path)
+    assert new_path.read_bytes() == b'mp3'
+
+
+def _tone(ms):
+    return ll.AudioSegment(data=bytes(range(256)) * (ms * 22 // 256 + 1), sample_width=2, frame_rate=11025, channels=1)
+
+
+def test_pcm_store_round_trips_across_a_reopen(tmp_path):
+    (tmp_path / 'a.mp3').write_bytes(b'mp3')
+    seg = _tone(100)
+    store = ll.PcmStore(tmp_path)
+    store.put('a.mp3', seg)
+    store.save()
+    store.close()
+
+    reopened = ll.PcmStore(tmp_path)
+    got = reopened.get('a.mp3')
+    assert got.raw_data == seg.raw_data
+    assert (got.frame_rate, got.channels, got.sample_width) == (11025, 1, 2)
+    reopened.close()
+
+
+def test_pcm_store_drops_and_compacts_entries_whose_mp3_is_gone(tmp_path):
+    for name in ('a.mp3', 'b.mp3'):
+        (tmp_path / name).write_bytes(b'mp3')
+    a, b = _tone(100), _tone(200)
+    store = ll.PcmStore(tmp_path)
+    store.put('a.mp3', a)
+    store.put('b.mp3', b)
+    store.save()
+    store.close()
+    (tmp_path / 'a.mp3').unlink()
+
+    reopened = ll.PcmStore(tmp_path)
+    assert reopened.get('a.mp3') is None
+    assert reopened.get('b.mp3').raw_data == b.raw_data
+    assert reopened.data_path.stat().st_size == len(b.raw_data)
+    reopened.close()
+
+
+def test_read_only_pcm_store_hands_its_decodes_to_take_pending(tmp_path):
+    (tmp_path / 'a.mp3').write_bytes(b'mp3')
+    seg = _tone(100)
+    store = ll.PcmStore(tmp_path, writable=False)
+    store.put('a.mp3', seg)
+    assert store.get('a.mp3').raw_data == seg.raw_data
+    assert not store.data_path.exists()
+
+    assert store.take_pending() == [('a.mp3', seg.raw_data, 11025, 1, 2)]
+    assert store.take_pending() == []
+    assert store.get('a.mp3') is None
+
+
+class _Seg:
+    def __init__(self, size):
+        self.raw_data = b'\0' * size
+
+
+def test_segment_cache_evicts_least_recently_used_within_its_byte_budget(monkeypatch):
+    monkeypatch.setattr(ll.Config, 'AUDIO_CACHE_MAX_BYTES', 10)
+    cache = ll.SegmentCache()
+    a, b, c = _Seg(4), _Seg(4), _Seg(4)
+    cache.put('a', a)
+    cache.put('b', b)
+    assert cache.get('a') is a  # a is now the most recent
+    cache.put('c', c)
+    assert cache.get('b') is None
+    assert cache.get('a') is a and cache.get('c') is c
+    assert cache._bytes == 8
+
+
+def test_segment_cache_keeps_an_oversized_last_item_and_recounts_a_re_put(monkeypatch):
+    monkeypatch.setattr(ll.Config, 'AUDIO_CACHE_MAX_BYTES', 10)
+    cache = ll.SegmentCache()
+    cache.put('a', _Seg(4))
+    big = _Seg(20)
+    cache.put('big', big)
+    assert cache.get('a') is None
+    assert cache.get('big') is big and cache._bytes == 20
+
+    small = _Seg(3)
+    cache.put('big', small)
+    assert cache.get('big') is small and cache._bytes == 3